@@ -0,0 +1,111 @@
+"""Hot-path record building for the CVE history importer.
+
+This module holds the pure per-record work (key probing, datetime parsing,
+fallback hashing, model construction) executed once per NVD record. It is
+kept free of I/O and strictly annotated so it can be AOT-compiled with
+
+    mypyc cve_records/_fast.py
+
+for deployments where the importer is CPU-bound; the compiled extension
+shadows this file automatically when present. It works unmodified as plain
+Python otherwise.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import orjson
+from django.utils.dateparse import parse_datetime
+
+from cve_records.models import CVEHistory
+
+# key probe orders for the helpers below; module-level tuples so the
+# per-record loop does a single pass instead of repeated chained .get calls
+_CVEID_KEYS = ("cveId", "id", "name")
+_TS_KEYS = ("timestamp", "time", "date", "modified", "created")
+
+
+def find_cveId(rec: Dict[str, Any]) -> str:
+    # the nested 'cve' shapes only when the key is actually present
+    if "cve" in rec:
+        c = rec["cve"]
+        if isinstance(c, dict):
+            if c.get("id"):
+                return c["id"]
+            # some APIs embed as 'cve' -> 'CVE_data_meta' -> 'ID'
+            meta = c.get("CVE_data_meta")
+            if isinstance(meta, dict) and meta.get("ID"):
+                return meta["ID"]
+    for k in _CVEID_KEYS:
+        v = rec.get(k)
+        if v:
+            return v
+    return "unknown"
+
+
+def find_timestamp(rec: Dict[str, Any]) -> Optional[str]:
+    for k in _TS_KEYS:
+        v = rec.get(k)
+        if v:
+            return v
+    return None
+
+
+def parse_created(created_raw: str) -> Optional[datetime]:
+    # NVD timestamps are consistently ISO-8601, so try the C-implemented
+    # fromisoformat first (~5x faster than Django's regex parser); only odd
+    # shapes fall through to parse_datetime
+    try:
+        if created_raw.endswith("Z"):
+            return datetime.fromisoformat(created_raw[:-1] + "+00:00")
+        return datetime.fromisoformat(created_raw)
+    except (TypeError, ValueError):
+        pass
+    created_dt = parse_datetime(created_raw)
+    if created_dt is None:
+        # try removing fractional seconds
+        try:
+            created_dt = parse_datetime(created_raw.split(".")[0])
+        except Exception:
+            created_dt = None
+    return created_dt
+
+
+def build_history(rec: Dict[str, Any]) -> Optional[CVEHistory]:
+    """Turn one raw record into an unsaved CVEHistory, or None if unusable."""
+    # the API returns items like {"change": {...}} — support that shape and fall back to the record itself
+    change = rec.get("change") if isinstance(rec, dict) and rec.get("change") else rec
+    if not isinstance(change, dict):
+        return None
+
+    cveId = change.get("cveId") or find_cveId(change)
+    eventName = change.get("eventName")
+    cveChangeId = change.get("cveChangeId") or change.get("id")
+    sourceIdentifier = change.get("sourceIdentifier")
+
+    created_raw = change.get("created") or change.get("date") or change.get("time")
+    created_dt = parse_created(created_raw) if created_raw else None
+
+    details = change.get("details") if isinstance(change.get("details"), (list, dict)) else None
+
+    # ensure we have a stable cveChangeId (unique). If missing, derive a hash from the raw change.
+    # BLAKE2b is faster than SHA-1 on CPython (SIMD core, no SHA-NI needed) and
+    # this id is only an internal uniqueness key, not a crypto protocol value;
+    # digest_size=20 keeps the hex length SHA-1 compatible.
+    if not cveChangeId:
+        # use JSON canonical representation (orjson emits bytes directly)
+        try:
+            raw = orjson.dumps(change, option=orjson.OPT_SORT_KEYS)
+        except Exception:
+            raw = str(change).encode("utf-8")
+        cveChangeId = hashlib.blake2b(raw, digest_size=20).hexdigest()
+
+    return CVEHistory(
+        cveId=cveId or "unknown",
+        eventName=eventName,
+        cveChangeId=cveChangeId,
+        sourceIdentifier=sourceIdentifier,
+        created=created_dt,
+        details=details,
+    )
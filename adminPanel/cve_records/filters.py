@@ -1,8 +1,20 @@
 import json
+import re
 from django_filters import rest_framework as filters
-from django.db.models import Q
+from django.db.models import Q, TextField
+from django.db.models.functions import Cast
 from .models import CVEHistory
 
+# a pasted CVE id can be answered from the cveId index instead of three
+# ORed icontains scans
+CVE_ID_RE = re.compile(r'^CVE-\d{4}-\d{4,7}$', re.IGNORECASE)
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Comma-separated multi-value filter handled natively by django-filter."""
+    pass
+
+
 class CVEHistoryFilter(filters.FilterSet):
     # Exact matches
     cveId = filters.CharFilter(lookup_expr='exact')
@@ -10,42 +22,46 @@ class CVEHistoryFilter(filters.FilterSet):
     cveChangeId = filters.CharFilter(lookup_expr='exact')
     sourceIdentifier = filters.CharFilter(lookup_expr='exact')
     
-    # Contains/icontains filters for text fields
+    # Contains/icontains filters for text fields. On Postgres these hit the
+    # pg_trgm GIN expression indexes on UPPER(col) from migration 0004 —
+    # matching the UPPER(col) LIKE UPPER(%s) SQL that icontains compiles to —
+    # rather than scanning the table.
     cveId_contains = filters.CharFilter(field_name='cveId', lookup_expr='icontains')
     eventName_contains = filters.CharFilter(field_name='eventName', lookup_expr='icontains')
     sourceIdentifier_contains = filters.CharFilter(field_name='sourceIdentifier', lookup_expr='icontains')
     
-    # JSON field contains (for both details and raw)
+    # JSON field contains (the raw column was dropped in migration 0002;
+    # details is the only JSON field left)
     details_contains = filters.CharFilter(method='filter_json_contains')
-    raw_contains = filters.CharFilter(method='filter_json_contains')
     
     # Multiple value filters (comma-separated)
-    cveId_in = filters.CharFilter(method='filter_list')
-    eventName_in = filters.CharFilter(method='filter_list')
-    sourceIdentifier_in = filters.CharFilter(method='filter_list')
-    
+    cveId_in = CharInFilter(field_name='cveId', lookup_expr='in')
+    eventName_in = CharInFilter(field_name='eventName', lookup_expr='in')
+    sourceIdentifier_in = CharInFilter(field_name='sourceIdentifier', lookup_expr='in')
+
     # Search across multiple fields
     search = filters.CharFilter(method='filter_search')
-    
-    def filter_list(self, queryset, name, value):
-        field_name = name.replace('_in', '')
-        values = [v.strip() for v in value.split(',') if v.strip()]
-        if values:
-            return queryset.filter(**{f"{field_name}__in": values})
-        return queryset
-    
+
     def filter_json_contains(self, queryset, name, value):
         field_name = name.replace('_contains', '')
-        try:
-            # Try to parse as JSON if it looks like JSON
-            if value.startswith('{') or value.startswith('['):
+        # JSON-looking input uses native JSON containment (GIN-indexed on
+        # Postgres); anything else is matched against the field cast to text,
+        # so we never run JSON containment with a bare-string operand
+        if value.startswith('{') or value.startswith('['):
+            try:
                 return queryset.filter(**{f"{field_name}__contains": json.loads(value)})
-            # Otherwise treat as string
-            return queryset.filter(**{f"{field_name}__contains": value})
-        except Exception:
-            return queryset.filter(**{f"{field_name}__contains": value})
+            except Exception:
+                pass
+        return queryset.annotate(
+            _json_text=Cast(field_name, TextField())
+        ).filter(_json_text__icontains=value)
     
     def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        if CVE_ID_RE.match(value):
+            return queryset.filter(cveId=value.upper())
         return queryset.filter(
             Q(cveId__icontains=value) |
             Q(eventName__icontains=value) |
@@ -1,23 +1,37 @@
+import io
+import threading
 import time
-import json
-from typing import Any, Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional, Tuple
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+import ijson
+import orjson
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-import hashlib
-from django.utils.dateparse import parse_datetime
 
+# build_history lives in its own strictly-typed module so the per-record hot
+# loop can optionally be AOT-compiled with mypyc (see cve_records/_fast.py)
+from cve_records._fast import build_history, find_cveId, find_timestamp  # noqa: F401
 from cve_records.models import CVEHistory, ImportCheckpoint
 
 
 API_URL = "https://services.nvd.nist.gov/rest/json/cvehistory/2.0"
 
+# Cached at module scope so repeated command invocations in the same process
+# reuse pooled keep-alive connections instead of re-handshaking TLS.
+_SESSION: Optional[requests.Session] = None
+
 
 def make_session(max_retries: int = 5, backoff_factor: float = 0.5) -> requests.Session:
+    global _SESSION
+    if _SESSION is not None:
+        return _SESSION
     s = requests.Session()
     retries = Retry(
         total=max_retries,
@@ -25,55 +39,93 @@ def make_session(max_retries: int = 5, backoff_factor: float = 0.5) -> requests.
         status_forcelist=(429, 500, 502, 503, 504),
         allowed_methods=("GET",),
     )
-    adapter = HTTPAdapter(max_retries=retries)
+    # all traffic goes to a single host, so a small pool of large size is enough
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=4, pool_maxsize=32)
     s.mount("https://", adapter)
     s.mount("http://", adapter)
-    s.headers.update({"User-Agent": "cve-history-importer/1.0 (+https://example)"})
+    s.headers.update(
+        {
+            "User-Agent": "cve-history-importer/1.0 (+https://example)",
+            "Connection": "keep-alive",
+        }
+    )
+    _SESSION = s
     return s
 
 
-def extract_records(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Try to find the main list of history records in the response JSON.
+class RateLimiter:
+    """Thread-safe pacer capping outgoing requests per second across workers."""
+
+    def __init__(self, per_second: float):
+        self._interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self._interval
+        if delay > 0:
+            time.sleep(delay)
 
-    This function prefers known keys but will fall back to the first list found.
+
+def stream_page(stream: Any) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Incrementally parse one page of response JSON.
+
+    Returns (meta, records): meta holds the top-level scalars seen before the
+    record array (totalResults etc., which NVD emits first), and records is a
+    lazy iterator over the items of the first top-level list — so the page is
+    never materialized as one big dict. Works for any top-level key
+    ("vulnerabilities", "cveHistory", ...) since it just takes the first array.
     """
-    # Common keys that may hold records
-    for key in ("vulnerabilities", "cveHistory", "result", "results", "cve_history"):
-        if key in payload and isinstance(payload[key], list):
-            return payload[key]
-
-    # fallback: return any top-level list value
-    for v in payload.values():
-        if isinstance(v, list):
-            return v
-
-    return []
-
-
-def find_cveId(rec: Dict[str, Any]) -> str:
-    # Try a few common shapes
-    if isinstance(rec.get("cve"), dict) and rec["cve"].get("id"):
-        return rec["cve"]["id"]
-    if rec.get("cveId"):
-        return rec.get("cveId")
-    if rec.get("cveId"):
-        return rec.get("cveId")
-    # some APIs embed as 'cve' -> 'CVE_data_meta' -> 'ID'
-    c = rec.get("cve") or {}
-    if isinstance(c, dict):
-        meta = c.get("CVE_data_meta") or {}
-        if isinstance(meta, dict) and meta.get("ID"):
-            return meta.get("ID")
-    # last resort
-    return rec.get("id") or rec.get("name") or "unknown"
-
-
-def find_timestamp(rec: Dict[str, Any]) -> Optional[str]:
-    for k in ("timestamp", "time", "date", "modified"):
-        v = rec.get(k)
-        if v:
-            return v
-    return None
+    events = ijson.parse(stream, use_float=True)
+    meta: Dict[str, Any] = {}
+
+    def _items(array_prefix: str) -> Iterator[Dict[str, Any]]:
+        item_prefix = array_prefix + ".item"
+        builder = None
+        for prefix, event, value in events:
+            if prefix == item_prefix and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif builder is not None:
+                builder.event(event, value)
+                if prefix == item_prefix and event == "end_map":
+                    yield builder.value
+                    builder = None
+            elif prefix == array_prefix and event == "end_array":
+                return
+
+    for prefix, event, value in events:
+        if event in ("number", "string", "boolean") and prefix and "." not in prefix:
+            meta[prefix] = value
+        elif event == "start_array" and prefix and "." not in prefix:
+            return meta, _items(prefix)
+
+    return meta, iter(())
+
+
+def _copy_escape(value: Any) -> str:
+    """Escape one value for PostgreSQL COPY text format (\\N for NULL)."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_line(obj: CVEHistory) -> str:
+    created = obj.created.isoformat() if obj.created else None
+    details = orjson.dumps(obj.details).decode() if obj.details is not None else None
+    values = (obj.cveId, obj.eventName, obj.cveChangeId, obj.sourceIdentifier, created, details)
+    return "\t".join(_copy_escape(v) for v in values) + "\n"
 
 
 class Command(BaseCommand):
@@ -85,159 +137,238 @@ class Command(BaseCommand):
         parser.add_argument("--start-index", type=int, help="startIndex to begin from (overrides checkpoint)")
         parser.add_argument("--batch-size", type=int, default=1000, help="DB bulk_create batch size")
         parser.add_argument("--max-pages", type=int, default=0, help="limit number of pages (0 = all)")
+        parser.add_argument("--concurrency", type=int, default=4, help="number of parallel page fetches")
+        parser.add_argument(
+            "--max-per-second", type=float, default=4.0, help="request rate cap shared across fetchers"
+        )
+        parser.add_argument(
+            "--use-copy",
+            action="store_true",
+            help="load rows via PostgreSQL COPY through a staging table (faster for full backfills)",
+        )
+
+    def fetch_page(
+        self, session: requests.Session, limiter: RateLimiter, start_index: int, page_size: int
+    ) -> requests.Response:
+        """GET a single page as an open stream, honouring the shared rate limiter.
+
+        Retries indefinitely on errors (with backoff) so a transient failure
+        never loses the importer's place. The caller is responsible for
+        consuming and closing the response.
+        """
+        params = {"startIndex": start_index, "resultsPerPage": page_size}
+        while True:
+            limiter.wait()
+            try:
+                resp = session.get(API_URL, params=params, timeout=30, stream=True)
+                if resp.status_code == 429:
+                    # backoff then retry
+                    wait = 60
+                    self.stdout.write(f"Rate limited (429). Sleeping {wait}s")
+                    resp.close()
+                    time.sleep(wait)
+                    continue
+                resp.raise_for_status()
+            except Exception as e:
+                self.stderr.write(f"Request failed at index {start_index}: {e}")
+                # don't crash; wait and retry
+                time.sleep(5)
+                continue
+            # let ijson read decoded (un-gzipped) bytes off the raw socket
+            resp.raw.decode_content = True
+            return resp
+
+    def iter_pages(
+        self,
+        session: requests.Session,
+        limiter: RateLimiter,
+        start: int,
+        page_size: int,
+        max_pages: int,
+        concurrency: int,
+    ) -> Iterator[Tuple[int, requests.Response]]:
+        """Yield (start_index, open response) pairs, prefetching concurrently.
+
+        The first page is fetched alone so the caller can learn totalResults
+        from it; once the caller reports the total (via the generator's
+        iteration continuing), the remaining indices go through a bounded
+        thread pool. Pages are yielded strictly in index order so checkpoint
+        advancement stays monotonic.
+        """
+        first = self.fetch_page(session, limiter, start, page_size)
+        yield start, first
+
+        total = self._total if isinstance(self._total, int) else None
+
+        if total is None:
+            # total unknown: fetch serially until the consumer stops on an
+            # empty page
+            index = start + page_size
+            page_count = 1
+            while not max_pages or page_count < max_pages:
+                yield index, self.fetch_page(session, limiter, index, page_size)
+                index += page_size
+                page_count += 1
+            return
+
+        indices = list(range(start + page_size, total, page_size))
+        if max_pages:
+            indices = indices[: max(0, max_pages - 1)]
+        if not indices:
+            return
+
+        # keep at most `concurrency` fetches in flight: submitting every
+        # index up front would pile up open streamed responses faster than
+        # the consumer drains them, and would keep fetching for hours after
+        # an error since executor shutdown runs all queued work
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        pending = deque()
+        try:
+            index_iter = iter(indices)
+            for index in islice(index_iter, concurrency):
+                pending.append((index, pool.submit(self.fetch_page, session, limiter, index, page_size)))
+            while pending:
+                index, future = pending.popleft()
+                resp = future.result()
+                next_index = next(index_iter, None)
+                if next_index is not None:
+                    pending.append(
+                        (next_index, pool.submit(self.fetch_page, session, limiter, next_index, page_size))
+                    )
+                yield index, resp
+        finally:
+            # on early exit (DB error, empty page) drop queued fetches and
+            # close any responses that completed but were never consumed
+            pool.shutdown(wait=False, cancel_futures=True)
+            for _, future in pending:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    future.result().close()
+
+    def copy_objs(self, obj_iter: Iterator[CVEHistory]) -> int:
+        """Bulk-load one page with COPY into a temp table, then upsert.
+
+        COPY skips per-row statement parsing and parameter binding, which is
+        what makes the initial multi-million-row backfill 5-10x faster than
+        multi-row INSERTs. The INSERT ... ON CONFLICT DO NOTHING step keeps
+        the cveChangeId dedup semantics of the bulk_create path. Must run
+        inside a transaction (the staging table is ON COMMIT DROP). Returns
+        the number of rows actually inserted (conflict-skipped duplicates
+        excluded).
+        """
+        table = CVEHistory._meta.db_table
+        cols = '"cveId", "eventName", "cveChangeId", "sourceIdentifier", "created", "details"'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE cve_history_copy_stage ("
+                '"cveId" varchar(200), "eventName" varchar(200), "cveChangeId" varchar(200), '
+                '"sourceIdentifier" varchar(200), "created" timestamptz, "details" jsonb'
+                ") ON COMMIT DROP"
+            )
+            copy_sql = f"COPY cve_history_copy_stage ({cols}) FROM STDIN"
+            raw = cursor.cursor
+            if hasattr(raw, "copy"):  # psycopg 3
+                with raw.copy(copy_sql) as copy:
+                    for obj in obj_iter:
+                        copy.write(_copy_line(obj))
+            else:  # psycopg2
+                buf = io.StringIO()
+                buf.writelines(_copy_line(obj) for obj in obj_iter)
+                buf.seek(0)
+                raw.copy_expert(copy_sql, buf)
+            cursor.execute(
+                f'INSERT INTO "{table}" ({cols}) '
+                f"SELECT {cols} FROM cve_history_copy_stage "
+                'ON CONFLICT ("cveChangeId") DO NOTHING'
+            )
+            return cursor.rowcount
 
     def handle(self, *args, **options):
         page_size = options["page_size"]
         batch_size = options["batch_size"]
         cp_name = options["checkpoint"]
         max_pages = options["max_pages"]
+        concurrency = options["concurrency"]
+        use_copy = options["use_copy"]
+
+        if use_copy and connection.vendor != "postgresql":
+            raise CommandError("--use-copy requires PostgreSQL")
 
         session = make_session()
+        limiter = RateLimiter(options["max_per_second"])
 
         # load or create checkpoint
         checkpoint, _ = ImportCheckpoint.objects.get_or_create(name=cp_name)
         start = int(options["start_index"]) if options.get("start_index") is not None else int(checkpoint.next_index or 0)
 
-        # first request to detect total
-        params = {"startIndex": start, "resultsPerPage": page_size}
         self.stdout.write(f"Starting import from index {start} (page_size={page_size})")
 
-        page_count = 0
-        total_results = None
-
-        while True:
-            if max_pages and page_count >= max_pages:
-                self.stdout.write("Reached max-pages limit, stopping.")
-                break
+        # iter_pages reads this back after the first page has been parsed
+        self._total = None
 
-            params["startIndex"] = start
-            params["resultsPerPage"] = page_size
+        for page_start, resp in self.iter_pages(session, limiter, start, page_size, max_pages, concurrency):
+            meta, records = stream_page(resp.raw)
 
-            try:
-                resp = session.get(API_URL, params=params, timeout=30)
-                if resp.status_code == 429:
-                    # backoff then retry
-                    wait = 60
-                    self.stdout.write(f"Rate limited (429). Sleeping {wait}s")
-                    time.sleep(wait)
-                    continue
-                resp.raise_for_status()
-            except Exception as e:
-                self.stderr.write(f"Request failed at index {start}: {e}")
-                # don't crash; wait and retry a few times
-                time.sleep(5)
-                continue
-
-            data = resp.json()
-
-            # determine total and resultsPerPage if available
-            if total_results is None:
+            # determine total from page metadata if available
+            if self._total is None:
                 for k in ("totalResults", "total", "count"):
-                    if isinstance(data.get(k), int):
-                        total_results = data.get(k)
+                    if isinstance(meta.get(k), int):
+                        self._total = meta[k]
                         break
 
-            # extract records list
-            records = extract_records(data)
+            # build model instances lazily and insert in batch_size chunks so
+            # the raw page and the full objs list never coexist in memory
+            seen = 0
 
-            if total_results is None:
-                # try to derive from headers or data
-                total_results = data.get("totalResults") or data.get("total")
+            def objs() -> Iterator[CVEHistory]:
+                nonlocal seen
+                for rec in records:
+                    seen += 1
+                    obj = build_history(rec)
+                    if obj is not None:
+                        yield obj
 
-            if not records:
-                self.stdout.write(f"No records found at startIndex={start}. Stopping.")
-                break
-
-            # prepare model instances matching our CVEHistory model (records often come as {"change": {...}})
-            objs = []
-            for rec in records:
-                # the API returns items like {"change": {...}} — support that shape and fall back to the record itself
-                change = rec.get("change") if isinstance(rec, dict) and rec.get("change") else rec
-                if not isinstance(change, dict):
-                    continue
-
-                cveId = change.get("cveId") or change.get("cveId") or find_cveId(change)
-                eventName = change.get("eventName") or change.get("eventName")
-                cveChangeId = change.get("cveChangeId") or change.get("cveChangeId") or change.get("id")
-                sourceIdentifier = change.get("sourceIdentifier") or change.get("sourceIdentifier")
-
-                created_raw = change.get("created") or change.get("date") or change.get("time")
-                created_dt = None
-                if created_raw:
-                    created_dt = parse_datetime(created_raw)
-                    if created_dt is None:
-                        # try removing fractional seconds
-                        try:
-                            created_dt = parse_datetime(created_raw.split(".")[0])
-                        except Exception:
-                            created_dt = None
-
-                details = change.get("details") if isinstance(change.get("details"), (list, dict)) else None
-
-                # ensure we have a stable cveChangeId (unique). If missing, derive a sha1 from the raw change
-                if not cveChangeId:
-                    # use JSON canonical representation
-                    try:
-                        raw_str = json.dumps(change, sort_keys=True)
-                    except Exception:
-                        raw_str = str(change)
-                    cveChangeId = hashlib.sha1(raw_str.encode("utf-8")).hexdigest()
-
-                objs.append(
-                    CVEHistory(
-                        cveId=cveId or "unknown",
-                        eventName=eventName,
-                        cveChangeId=cveChangeId,
-                        sourceIdentifier=sourceIdentifier,
-                        created=created_dt,
-                        details=details,
-                    )
-                )
-
-            # bulk insert in chunks while avoiding duplicates by cveChangeId
-            created = 0
             try:
                 with transaction.atomic():
-                    for i in range(0, len(objs), batch_size):
-                        chunk = objs[i : i + batch_size]
-                        # get cveChangeIds in this chunk
-                        chunk_ids = [o.cveChangeId for o in chunk if o.cveChangeId]
-                        # query existing ids to avoid unique constraint failures
-                        existing = set()
-                        if chunk_ids:
-                            existing = set(
-                                CVEHistory.objects.filter(cveChangeId__in=chunk_ids).values_list(
-                                    "cveChangeId", flat=True
-                                )
+                    if use_copy:
+                        self.copy_objs(objs())
+                    else:
+                        obj_iter = objs()
+                        while True:
+                            chunk = list(islice(obj_iter, batch_size))
+                            if not chunk:
+                                break
+                            # ignore_conflicts resolves duplicates against the
+                            # cveChangeId UNIQUE index in the same round-trip
+                            # (ON CONFLICT DO NOTHING on Postgres, INSERT OR
+                            # IGNORE on SQLite, INSERT IGNORE on MySQL), so
+                            # re-imports are idempotent with no existence SELECT.
+                            # The return value is useless as an insert count:
+                            # with ignore_conflicts bulk_create echoes every
+                            # object passed, duplicates included.
+                            CVEHistory.objects.bulk_create(
+                                chunk, batch_size=batch_size, ignore_conflicts=True
                             )
-
-                        to_create = [o for o in chunk if o.cveChangeId not in existing]
-                        if to_create:
-                            CVEHistory.objects.bulk_create(to_create, batch_size=batch_size)
-                            created += len(to_create)
-                        else:
-                            # nothing new in this chunk
-                            pass
             except Exception as e:
-                self.stderr.write(f"DB insert failed at start {start}: {e}")
+                self.stderr.write(f"DB insert failed at start {page_start}: {e}")
                 # Do not advance checkpoint; allow rerun after fix
                 raise
+            finally:
+                resp.close()
 
-            start += len(records)
-            checkpoint.next_index = start
-            if isinstance(total_results, int):
-                checkpoint.total = total_results
-            checkpoint.save()
-
-            page_count += 1
-            self.stdout.write(f"Imported {created} records (progress: {start}/{total_results or 'unknown'})")
-
-            # stop when we've reached total
-            if isinstance(total_results, int) and start >= total_results:
-                self.stdout.write("All records imported.")
+            if not seen:
+                self.stdout.write(f"No records found at startIndex={page_start}. Stopping.")
                 break
 
-            # small sleep to be polite and avoid rate limits
-            time.sleep(0.2)
+            # pages arrive in index order, so this stays monotonic
+            checkpoint.next_index = page_start + seen
+            if isinstance(self._total, int):
+                checkpoint.total = self._total
+            checkpoint.save()
+
+            # "processed", not "imported": neither insert path can cheaply say
+            # how many rows were new rather than conflict-skipped duplicates
+            self.stdout.write(
+                f"Processed {seen} records (progress: {checkpoint.next_index}/{self._total or 'unknown'})"
+            )
 
         self.stdout.write("Import finished. Checkpoint saved: %s" % checkpoint.next_index)
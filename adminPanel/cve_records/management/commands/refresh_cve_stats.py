@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = "Refresh the cve_history_stats_daily materialized view (Postgres only)."
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write("Skipped: materialized view refresh requires PostgreSQL.")
+            return
+        # CONCURRENTLY keeps the dashboard readable during the refresh; it
+        # needs the unique index created in migration 0005
+        with connection.cursor() as cursor:
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY cve_history_stats_daily")
+        self.stdout.write("Refreshed cve_history_stats_daily.")
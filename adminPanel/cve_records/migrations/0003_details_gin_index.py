@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+# GIN index so JSON containment queries on details (the details_contains
+# filter) use an index scan instead of re-serializing every row. Postgres
+# only; a no-op on other backends, which keep their native JSON handling.
+def add_details_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS "cve_records_details_gin" '
+        'ON "cve_records_cvehistory" USING gin ("details" jsonb_path_ops)'
+    )
+
+
+def drop_details_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "cve_records_details_gin"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cve_records", "0002_remove_cvehistory_cve_records_cve_id_e9b96b_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_details_gin_index, drop_details_gin_index),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+_COLUMNS = {
+    "cve_records_cveid_trgm": "cveId",
+    "cve_records_eventname_trgm": "eventName",
+    "cve_records_sourceident_trgm": "sourceIdentifier",
+}
+
+
+# pg_trgm GIN indexes so the icontains lookups behind filter_search and the
+# *_contains filters become index range scans instead of sequential scans.
+# Django's Postgres backend compiles icontains as
+# UPPER("col"::text) LIKE UPPER(%s), so the indexes must be built on the
+# same UPPER(col) expression — a bare-column trigram index never matches
+# the predicate and the planner ignores it. Postgres only; no-op elsewhere.
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, column in _COLUMNS.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+            f'ON "cve_records_cvehistory" USING gin (UPPER("{column}") gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index_name in _COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cve_records", "0003_details_gin_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+# Materialized view backing the dashboard aggregates so page loads read
+# precomputed counts instead of re-scanning the history table. The unique
+# index allows REFRESH MATERIALIZED VIEW CONCURRENTLY. Postgres only;
+# other backends keep aggregating the base table directly.
+def create_stats_view(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE MATERIALIZED VIEW IF NOT EXISTS cve_history_stats_daily AS "
+        'SELECT date_trunc(\'day\', "created")::date AS d, '
+        '"eventName", "sourceIdentifier", count(*) AS count '
+        'FROM "cve_records_cvehistory" '
+        "GROUP BY 1, 2, 3"
+    )
+    schema_editor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS cve_history_stats_daily_uniq "
+        'ON cve_history_stats_daily (d, "eventName", "sourceIdentifier")'
+    )
+
+
+def drop_stats_view(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP MATERIALIZED VIEW IF EXISTS cve_history_stats_daily")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cve_records", "0004_trigram_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CVEHistoryStatsDaily",
+            fields=[
+                ("d", models.DateField(primary_key=True, serialize=False)),
+                ("eventName", models.CharField(max_length=200, null=True)),
+                ("sourceIdentifier", models.CharField(max_length=200, null=True)),
+                ("count", models.BigIntegerField()),
+            ],
+            options={
+                "db_table": "cve_history_stats_daily",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_stats_view, drop_stats_view),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+# Stored generated day bucket for created, with a btree index, so daily
+# GROUP BYs (the line chart) become index scans instead of per-row
+# date_trunc calls. AT TIME ZONE 'UTC' keeps the expression immutable as
+# generated columns require. Postgres only; other backends keep TruncDate.
+# Intentionally not mapped as a model field: Django 4.2 would include it
+# in INSERT statements, which generated columns reject.
+def add_generated_columns(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        'ALTER TABLE "cve_records_cvehistory" '
+        "ADD COLUMN IF NOT EXISTS created_date date "
+        "GENERATED ALWAYS AS ((created AT TIME ZONE 'UTC')::date) STORED"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS cve_records_created_date_idx "
+        'ON "cve_records_cvehistory" (created_date)'
+    )
+
+
+def drop_generated_columns(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        'ALTER TABLE "cve_records_cvehistory" DROP COLUMN IF EXISTS created_date'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cve_records", "0005_cve_history_stats_daily"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_generated_columns, drop_generated_columns),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-08-28 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cve_records', '0006_created_generated_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cvehistory',
+            index=models.Index(fields=['created', 'id'], name='cve_records_created_429b03_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cvehistory',
+            index=models.Index(fields=['eventName', 'created', 'id'], name='cve_records_eventNa_1d4fb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cvehistory',
+            index=models.Index(fields=['sourceIdentifier', 'created', 'id'], name='cve_records_sourceI_50959a_idx'),
+        ),
+    ]
@@ -27,14 +27,38 @@ class CVEHistory(models.Model):
 			models.Index(fields=["cveId"]),
 			models.Index(fields=["cveChangeId"]),
 			models.Index(fields=["created", "id"]),  # Compound index for sorted pagination
-			models.Index(fields=["eventName", "id"]),  # Common sort field
-			models.Index(fields=["sourceIdentifier", "id"]),  # Common filter/sort field
+			# common filters combined with the default created ordering, so
+			# filtered list pages come back pre-sorted from an index scan
+			models.Index(fields=["eventName", "created", "id"]),
+			models.Index(fields=["sourceIdentifier", "created", "id"]),
 		]
 
 	def __str__(self) -> str:
 		return f"{self.cveId} ({self.cveChangeId}) @ {self.created} [{self.eventName}]"
 
 
+class CVEHistoryStatsDaily(models.Model):
+	"""Read-only mapping of the cve_history_stats_daily materialized view.
+
+	Postgres only: the view is created in migration 0005 and refreshed via
+	the refresh_cve_stats management command (cron, or after an import run).
+	One row per (day, eventName, sourceIdentifier) with its record count.
+	"""
+	# the view has no real primary key; d is only marked as one so Django
+	# can map the table — never rely on it for identity
+	d = models.DateField(primary_key=True)
+	eventName = models.CharField(max_length=200, null=True)
+	sourceIdentifier = models.CharField(max_length=200, null=True)
+	count = models.BigIntegerField()
+
+	class Meta:
+		managed = False
+		db_table = "cve_history_stats_daily"
+
+	def __str__(self) -> str:
+		return f"{self.d} {self.eventName} {self.sourceIdentifier}: {self.count}"
+
+
 class ImportCheckpoint(models.Model):
 	"""Simple checkpoint to allow resuming long-running imports.
 
@@ -5,6 +5,13 @@ class CVEHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = CVEHistory
         fields = [
-            'id', 'cveId', 'eventName', 'cveChangeId', 
+            'id', 'cveId', 'eventName', 'cveChangeId',
             'sourceIdentifier', 'created', 'details'
-        ]
\ No newline at end of file
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the viewset defers the large details column on list requests;
+        # drop the field here too or each row would lazy-load it separately
+        if not self.context.get('include_details', False):
+            self.fields.pop('details', None)
\ No newline at end of file
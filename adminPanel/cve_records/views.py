@@ -1,15 +1,61 @@
+import hashlib
+from collections import Counter
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from rest_framework import viewsets, filters
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
+from django.core.cache import cache
+from django.db.models import Q, Count, DateField
+from django.db.models.expressions import RawSQL
 from django.views.generic import TemplateView
-from django.db.models.functions import TruncDate
+from django.db.models.functions import TruncDate, TruncMonth
 from django.shortcuts import render
 from chartjs.views.lines import BaseLineChartView
-from .models import CVEHistory
+from django.db import connection
+from .models import CVEHistory, CVEHistoryStatsDaily
 from .serializers import CVEHistorySerializer
 from .filters import CVEHistoryFilter
 
+def _estimated_history_count():
+    """Planner row estimate for the history table (Postgres pg_class)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+            [CVEHistory._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return int(row[0]) if row else None
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator that avoids COUNT(*) for unfiltered querysets.
+
+    Page-number pagination runs SELECT COUNT(*) on every request; on a
+    multi-million-row table that full scan dominates latency when no filter
+    narrows the queryset. For an unfiltered queryset on Postgres we use the
+    planner's reltuples estimate instead (cached for 60s); filtered queries
+    keep the exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if (
+            connection.vendor == 'postgresql'
+            and hasattr(queryset, 'query')
+            and not queryset.query.where
+        ):
+            estimate = cache.get_or_set(
+                'cve_records_cvehistory_reltuples', _estimated_history_count, 60
+            )
+            # reltuples is -1 until the table has been analyzed
+            if estimate is not None and estimate >= 0:
+                return estimate
+        return super().count
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     """Custom pagination with smaller default page size to prevent memory issues.
 
@@ -20,6 +66,7 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 1000
     page_query_param = 'page'
+    django_paginator_class = ApproximateCountPaginator
 
     def get_page_number(self, request, paginator):
         """Allow either `page` or `page_number` query params.
@@ -32,6 +79,40 @@ class StandardResultsSetPagination(PageNumberPagination):
             return super().get_page_number(request, paginator)
         return page_number
 
+class CVEHistoryCursorPagination(CursorPagination):
+    """Cursor-based pagination for deep paging.
+
+    Offset pagination makes the database scan and discard OFFSET rows, so
+    page=10000 costs O(N); a cursor seeks straight to the page via an index
+    regardless of depth. The cursor is keyed on -id because the key must be
+    non-null and unique: created is neither — the importer stores NULL for
+    unparseable timestamps, and a NULL landing on a page boundary breaks
+    cursor encoding — while import order tracks created closely anyway.
+    """
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        # pin the cursor key: the default implementation prefers the view's
+        # OrderingFilter, whose default ('created') is nullable/non-unique
+        # and whose client-supplied sort would silently become the key.
+        # Requests with ?sort= never reach this paginator — the view
+        # switches them to offset pagination (see CVEHistoryViewSet.paginator).
+        return self.ordering
+
+
+class SortOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter wired to the documented ``sort`` query parameter.
+
+    DRF's default parameter name is ``ordering``; the public API and README
+    advertise ``sort``, so without this the filter always fell back to the
+    view's default ordering and client sorts were silently dropped.
+    """
+    ordering_param = 'sort'
+
+
 class CVEHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for querying CVE History records.
@@ -59,7 +140,6 @@ class CVEHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     
     JSON field filters:
     - details_contains: Search in details JSON
-    - raw_contains: Search in raw JSON
     
     Multiple values:
     - Add _in suffix for multiple values (comma-separated)
@@ -81,17 +161,19 @@ class CVEHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     - /api/cve-history/?sort=-created&page_size=50
     - /api/cve-history/?source_identifier=mitre&details_contains={"severity":"high"}
     """
-    queryset = CVEHistory.objects.all().only(
-        'id', 'cveId', 'eventName', 'cveChangeId',
-        'sourceIdentifier', 'created'
-    ).defer('details')  # Defer large JSON fields unless specifically requested
-    
+    # Prune the large details JSON column unless specifically requested;
+    # a single .only() call is the authoritative field list (mixing .only()
+    # with .defer() makes Django ignore parts of the specification)
+    LIST_FIELDS = ('id', 'cveId', 'eventName', 'cveChangeId', 'sourceIdentifier', 'created')
+
+    queryset = CVEHistory.objects.only(*LIST_FIELDS)
+
     serializer_class = CVEHistorySerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CVEHistoryCursorPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
-        filters.OrderingFilter,
+        SortOrderingFilter,
     ]
     filterset_class = CVEHistoryFilter
     search_fields = [
@@ -117,12 +199,12 @@ class CVEHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         - Adds specific optimizations for sorting
         """
         queryset = super().get_queryset()
-        
-        # If JSON fields are needed (check request parameters)
-        request = self.request
-        if request and any(param in request.query_params for param in ['details_contains']):
-            queryset = CVEHistory.objects.all()  # Don't defer JSON fields
-        
+
+        # If JSON fields are needed, widen the base .only() instead of
+        # replacing the queryset (which would undo the column pruning)
+        if self._include_details():
+            queryset = queryset.only(*self.LIST_FIELDS, 'details')
+
         # Get the sort fields
         ordering = self.request.query_params.get('sort', 'created').split(',')
         
@@ -135,96 +217,219 @@ class CVEHistoryViewSet(viewsets.ReadOnlyModelViewSet):
             elif sort_field in ['cveId', 'eventName']:
                 # For string sorting, add id as secondary sort to ensure stability
                 queryset = queryset.order_by(ordering[0], 'id')
-        
+
         return queryset
 
+    @property
+    def paginator(self):
+        # clients that need absolute page numbers can opt back into offset
+        # pagination with ?paginator=offset; deep pages pay the OFFSET cost.
+        # Custom sorts also fall back to offset automatically: the cursor is
+        # pinned to -id (see CVEHistoryCursorPagination.get_ordering), so
+        # honoring ?sort= under the cursor would silently reorder pages out
+        # from under the key.
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if self.request and (
+                self.request.query_params.get('paginator') == 'offset'
+                or 'sort' in self.request.query_params
+            ):
+                pagination_class = StandardResultsSetPagination
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
+
+    def _include_details(self):
+        """Whether this request should fetch and serialize the details JSON."""
+        # single-record fetches always carry details; pruning only pays off
+        # on list pages
+        if getattr(self, 'action', None) == 'retrieve':
+            return True
+        request = self.request
+        if not request:
+            return False
+        params = request.query_params
+        return 'details_contains' in params or params.get('include_details') in ('1', 'true', 'yes')
+
+    def get_serializer_context(self):
+        # keep the serializer in step with the pruned queryset, otherwise a
+        # deferred details access would issue one extra query per row
+        context = super().get_serializer_context()
+        context['include_details'] = self._include_details()
+        return context
+
 
 class CVEDashboardView(TemplateView):
     template_name = 'cve_records/dashboard.html'
 
+    # stats are ~unchanged within a minute; cache per filter combination so
+    # repeated page loads skip the aggregation entirely
+    STATS_CACHE_TTL = 60
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
+
         # Get filter parameters
         date_from = self.request.GET.get('date_from')
         date_to = self.request.GET.get('date_to')
         event_type = self.request.GET.get('event_type')
-        
-        # Base queryset
-        queryset = CVEHistory.objects.all()
-        
-        # Apply filters
-        if date_from:
-            queryset = queryset.filter(created__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(created__lte=date_to)
-        if event_type:
-            queryset = queryset.filter(eventName=event_type)
-        
-        # Event type distribution
-        event_stats = queryset.values('eventName') \
-            .annotate(count=Count('id')) \
-            .order_by('-count')
-        
-        # Timeline data
-        timeline_data = queryset.annotate(
-            date=TruncDate('created')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
-        
-        # Source distribution
-        source_stats = queryset.values('sourceIdentifier') \
-            .annotate(count=Count('id')) \
-            .order_by('-count')
-        
-        # Monthly trend
-        from django.db.models.functions import TruncMonth
-        monthly_trend = queryset.annotate(
-            month=TruncMonth('created')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
-        
-        # Get all event types for filter dropdown
-        all_event_types = CVEHistory.objects.values_list('eventName', flat=True).distinct()
-        
-        # Total counts
-        total_cves = queryset.count()
-        total_sources = queryset.values('sourceIdentifier').distinct().count()
-        
-        context.update({
+
+        # hash the user-supplied params: raw values can contain characters
+        # (spaces etc.) that memcached rejects, and the raw key space is
+        # unbounded
+        params = hashlib.md5(
+            f"{date_from}|{date_to}|{event_type}".encode("utf-8")
+        ).hexdigest()
+        cache_key = f"cve_dashboard_stats:{params}"
+        stats = cache.get_or_set(
+            cache_key,
+            lambda: self.build_stats(date_from, date_to, event_type),
+            self.STATS_CACHE_TTL,
+        )
+
+        context.update(stats)
+        context['filters'] = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'event_type': event_type,
+        }
+        return context
+
+    def build_stats(self, date_from, date_to, event_type):
+        """Compute every dashboard aggregate from a single source of rows.
+
+        On Postgres the rows come from the cve_history_stats_daily
+        materialized view (refreshed by the refresh_cve_stats command), so
+        page loads never touch the history table. Elsewhere they come from
+        one grouped query over the base table — still a single scan instead
+        of the one-query-per-chart the view used to issue. Either way the
+        (eventName, sourceIdentifier, day) rows are pivoted in Python.
+        """
+        if connection.vendor == 'postgresql':
+            stats_qs = CVEHistoryStatsDaily.objects.all()
+            # the view is day-granular, so date filters apply to the day bucket
+            if date_from:
+                stats_qs = stats_qs.filter(d__gte=date_from)
+            if date_to:
+                stats_qs = stats_qs.filter(d__lte=date_to)
+            if event_type:
+                stats_qs = stats_qs.filter(eventName=event_type)
+            rows = (
+                {
+                    'eventName': r['eventName'],
+                    'sourceIdentifier': r['sourceIdentifier'],
+                    'date': r['d'],
+                    'month': r['d'].replace(day=1) if r['d'] else None,
+                    'count': r['count'],
+                }
+                for r in stats_qs.values('d', 'eventName', 'sourceIdentifier', 'count')
+            )
+        else:
+            # Base queryset
+            queryset = CVEHistory.objects.all()
+
+            # Apply filters
+            if date_from:
+                queryset = queryset.filter(created__gte=date_from)
+            if date_to:
+                queryset = queryset.filter(created__lte=date_to)
+            if event_type:
+                queryset = queryset.filter(eventName=event_type)
+
+            rows = queryset.annotate(
+                date=TruncDate('created'),
+                month=TruncMonth('created'),
+            ).values('eventName', 'sourceIdentifier', 'date', 'month').annotate(
+                count=Count('id')
+            )
+
+        event_counts = Counter()
+        source_counts = Counter()
+        day_counts = Counter()
+        month_counts = Counter()
+        total_cves = 0
+
+        for row in rows:
+            n = row['count']
+            total_cves += n
+            event_counts[row['eventName']] += n
+            source_counts[row['sourceIdentifier']] += n
+            day_counts[row['date']] += n
+            month_counts[row['month']] += n
+
+        # same shapes the template consumed before: dicts ordered by -count
+        # for the distributions and chronologically for the time series
+        event_stats = [
+            {'eventName': k, 'count': v} for k, v in event_counts.most_common()
+        ]
+        source_stats = [
+            {'sourceIdentifier': k, 'count': v} for k, v in source_counts.most_common()
+        ]
+        timeline_data = [
+            {'date': d, 'count': day_counts[d]}
+            for d in sorted(day_counts, key=lambda d: (d is None, d))
+        ]
+        monthly_trend = [
+            {'month': m, 'count': month_counts[m]}
+            for m in sorted(month_counts, key=lambda m: (m is None, m))
+        ]
+
+        # Get all event types for filter dropdown (unfiltered, tiny result);
+        # read the stats view where it exists to keep off the base table
+        if connection.vendor == 'postgresql':
+            all_event_types = list(
+                CVEHistoryStatsDaily.objects.values_list('eventName', flat=True).distinct()
+            )
+        else:
+            all_event_types = list(
+                CVEHistory.objects.values_list('eventName', flat=True).distinct()
+            )
+
+        return {
             'event_stats': event_stats,
             'timeline_data': timeline_data,
             'source_stats': source_stats,
             'monthly_trend': monthly_trend,
             'all_event_types': all_event_types,
             'total_cves': total_cves,
-            'total_sources': total_sources,
-            'filters': {
-                'date_from': date_from,
-                'date_to': date_to,
-                'event_type': event_type,
-            }
-        })
-        return context
+            'total_sources': len(source_counts),
+        }
 
 
 class CVELineChartView(BaseLineChartView):
+    # labels and data share one aggregation; cache it briefly so a chart
+    # render (which calls both) hits the DB at most once
+    AGGREGATE_CACHE_TTL = 300
+
+    def _by_day(self):
+        # on Postgres, group by the stored created_date generated column
+        # (migration 0006) so the GROUP BY rides its btree index instead of
+        # re-running date_trunc per row
+        if connection.vendor == 'postgresql':
+            return CVEHistory.objects.annotate(
+                date=RawSQL('"created_date"', [], output_field=DateField())
+            )
+        return CVEHistory.objects.annotate(date=TruncDate('created'))
+
+    def _aggregate(self):
+        """Daily (date, count) pairs, computed once per cache window.
+
+        get_labels and get_data previously each ran their own full
+        aggregation query; both now read this shared result. iterator()
+        keeps memory bounded while the rows are consumed into tuples.
+        """
+        def compute():
+            rows = self._by_day().values('date').annotate(
+                count=Count('id')
+            ).order_by('date')
+            return [(r['date'], r['count']) for r in rows.iterator(chunk_size=2000)]
+
+        return cache.get_or_set('cve_line_chart', compute, self.AGGREGATE_CACHE_TTL)
+
     def get_labels(self):
-        dates = CVEHistory.objects.annotate(
-            date=TruncDate('created')
-        ).values_list('date', flat=True).distinct().order_by('date')
-        return [d.strftime('%Y-%m-%d') for d in dates]
+        return [d.strftime('%Y-%m-%d') for d, _ in self._aggregate()]
 
     def get_data(self):
-        dates = CVEHistory.objects.annotate(
-            date=TruncDate('created')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
-        
-        return [[d['count'] for d in dates]]
+        return [[count for _, count in self._aggregate()]]
 
     def get_providers(self):
         return ["CVE Updates"]
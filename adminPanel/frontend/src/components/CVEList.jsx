@@ -26,7 +26,9 @@ export default function CVEList() {
     async (p = page, ps = pageSize, s = sort, f = filters) => {
       setLoading(true);
       try {
-        const params = { page: p, page_size: ps, sort: s };
+        // offset mode: the API defaults to cursor pagination, which has no
+        // page numbers or count — this table UI needs both
+        const params = { paginator: "offset", page: p, page_size: ps, sort: s };
         // include simple filters
         if (f.q) params.q = f.q;
         if (f.cveId) params.cveId = f.cveId;